@@ -5,18 +5,31 @@ Reads an Overpass QL query from query.overpassql, executes it against
 multiple Overpass API endpoints with fallback, converts the response to
 GeoJSON with full geometry support, and writes data.geojson.
 
-Zero external dependencies — stdlib only.
+Zero external dependencies — stdlib only. If orjson is installed it is
+used for faster JSON parsing and serialization.
 """
 
+import gzip
+import hashlib
 import json
+import mmap
 import os
+import re
 import sys
+import threading
 import time
 import urllib.error
 import urllib.parse
 import urllib.request
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 
+try:
+    import orjson
+except ImportError:  # optional speedup, fall back to stdlib json
+    orjson = None
+
 OVERPASS_ENDPOINTS = [
     "https://overpass-api.de/api/interpreter",
     "https://overpass-api.de/api/interpreter",
@@ -32,9 +45,39 @@ OVERPASS_ENDPOINTS = [
 # QUERY_FILE = "query.overpassql"
 # OUTPUT_FILE = "data.geojson"
 CONFIG_FILE = "config.json"
+# HTTP validators from previous runs, used for conditional requests
+FETCH_CACHE_FILE = ".fetch_cache.json"
 DEFAULT_DROP_THRESHOLD = 50  # percent
 DEFAULT_MAX_DATA_LAG_HOURS = 48
 REQUEST_TIMEOUT = 180  # seconds
+# Overpass allows only a couple of concurrent slots per client, so never
+# race more than two distinct servers at once.
+MAX_CONCURRENT_REQUESTS = 2
+ENDPOINT_STAGGER_SECONDS = 0.5
+REQUEST_HEADERS = {
+    "User-Agent": "microcosm-us-route-relations/1.0",
+    "Accept-Encoding": "gzip, deflate",
+}
+COORD_PRECISION = 7  # decimal places stored by OSM
+PARALLEL_MIN_ELEMENTS = 1000  # below this, process startup costs more than it saves
+PARALLEL_CHUNKSIZE = 256
+
+# Overpass writes the osm3s header before the elements array, so the data
+# timestamp can be read from the start of the body without a full parse.
+TIMESTAMP_SCAN_BYTES = 4096
+TIMESTAMP_RE = re.compile(rb'"timestamp_osm_base"\s*:\s*"([^"]*)"')
+
+# Matches the start of each Feature object in a FeatureCollection, with or
+# without pretty-printing. Both writers emit "type" as a Feature's first key,
+# followed by "id" or "geometry", so a "type": "Feature" tag inside
+# properties does not match ("FeatureCollection" does not match either).
+FEATURE_TYPE_RE = re.compile(rb'\{\s*"type"\s*:\s*"Feature"\s*,\s*"(?:id|geometry)"\s*:')
+
+# Relation types whose members are assembled into (multi)polygons
+POLYGON_RELATION_TYPES = frozenset({"multipolygon", "boundary"})
+
+# Canonical output ordering: node < way < relation, then by ID
+TYPE_ORDER = {"node": 0, "way": 1, "relation": 2}
 
 # Tags that indicate a closed way should be treated as a Polygon (area)
 # rather than a LineString. Based on XofY's isArea() and standard OSM conventions.
@@ -45,17 +88,45 @@ AREA_TAG_KEYS = {
 }
 
 # Specific tag=value pairs that indicate area semantics
-AREA_TAG_VALUES = {
-    ("highway", "rest_area"),
-    ("highway", "services"),
-    ("leisure", "track"),
-    ("natural", "water"),
-    ("waterway", "riverbank"),
-    ("waterway", "dock"),
-    ("waterway", "boatyard"),
+AREA_TAG_VALUES_BY_KEY = {
+    "highway": {"rest_area", "services"},
+    "leisure": {"track"},
+    "natural": {"water"},
+    "waterway": {"riverbank", "dock", "boatyard"},
 }
 
 
+# ---------------------------------------------------------------------------
+# JSON backend
+# ---------------------------------------------------------------------------
+
+if orjson is not None:
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def json_loads(data):
+        """Parse JSON from bytes or str."""
+        return orjson.loads(data)
+
+    def json_dumps_line(obj):
+        """Serialize obj as compact single-line UTF-8 JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+else:
+    JSONDecodeError = json.JSONDecodeError
+
+    def json_loads(data):
+        """Parse JSON from bytes or str."""
+        return json.loads(data)
+
+    def json_dumps_line(obj):
+        """Serialize obj as compact single-line UTF-8 JSON bytes."""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_dump(obj, f):
+    """Serialize obj as UTF-8 JSON to a binary file."""
+    f.write(json_dumps_line(obj))
+
+
 # ---------------------------------------------------------------------------
 # Query reading
 # ---------------------------------------------------------------------------
@@ -80,12 +151,44 @@ def read_query(path):
 # Overpass API fetching with multi-server fallback
 # ---------------------------------------------------------------------------
 
-def check_data_freshness(data, endpoint, max_lag_hours):
-    """Check osm3s.timestamp_osm_base for data staleness.
+# Returned by try_endpoint when the server answers 304 Not Modified
+NOT_MODIFIED = object()
+
+# Shared opener so handler setup happens once rather than per request
+HTTP_OPENER = urllib.request.build_opener()
+
+
+def read_response(resp):
+    """Read a response body, undoing any gzip/deflate Content-Encoding."""
+    body = resp.read()
+    encoding = resp.headers.get("Content-Encoding", "").lower()
+    if encoding == "gzip":
+        return gzip.decompress(body)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def peek_timestamp(body):
+    """Read osm3s.timestamp_osm_base from the head of a raw JSON response.
+
+    Returns the timestamp string, or "" if it is not present.
+    """
+    match = TIMESTAMP_RE.search(body, 0, TIMESTAMP_SCAN_BYTES)
+    if not match:
+        return ""
+    return match.group(1).decode("utf-8", "replace")
+
+
+def check_data_freshness(timestamp_str, max_lag_hours):
+    """Check an osm3s.timestamp_osm_base value for data staleness.
 
     Returns (is_fresh, lag_hours, timestamp_str).
     """
-    timestamp_str = data.get("osm3s", {}).get("timestamp_osm_base", "")
     if not timestamp_str:
         return True, 0, "(unknown)"
 
@@ -98,92 +201,240 @@ def check_data_freshness(data, endpoint, max_lag_hours):
         return True, 0, timestamp_str
 
 
-def fetch_overpass(query, out_format="json"):
-    """Send query to Overpass API endpoints with fallback.
+def try_endpoint(attempt, endpoint, encoded, out_format, max_lag_hours, done,
+                 validators=None, received=None, delay=0):
+    """Run one Overpass request and validate the response.
+
+    Handles rate limiting (HTTP 429), network errors, and data freshness
+    validation. Errors back off before returning so the worker thread does
+    not immediately retry the same server. On success the `done` event is
+    set so attempts that have not started yet are skipped.
 
-    Tries each endpoint in order. Handles rate limiting (HTTP 429),
-    network errors, and data freshness validation.
+    validators is a read-only copy of this endpoint's cache entry. If it
+    has an ETag or Last-Modified, the query is sent as a GET with
+    If-None-Match / If-Modified-Since; otherwise it is POSTed. received
+    is a dict owned by this attempt, filled from a successful response.
 
-    Returns parsed JSON response dict.
+    Returns (data, None) on success, (NOT_MODIFIED, None) on HTTP 304,
+    (None, error) on failure, or (None, None) if another attempt already
+    succeeded.
     """
-    max_lag_hours = float(
-        os.environ.get("TAP_IN_OSM_MAX_DATA_LAG_HOURS", DEFAULT_MAX_DATA_LAG_HOURS)
-    )
-    encoded = urllib.parse.urlencode({"data": query}).encode("utf-8")
-    last_error = None
+    tag = f"[{attempt + 1}]"
+    if delay:
+        time.sleep(delay)
+    if done.is_set():
+        return None, None
+    print(f"{tag} Trying {endpoint} ...")
+    headers = dict(REQUEST_HEADERS)
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+    if len(headers) > len(REQUEST_HEADERS):
+        # Conditional headers only apply to GET; on a POST, If-Modified-Since
+        # is ignored and a matching If-None-Match yields 412, not 304.
+        url, data = f"{endpoint}?{encoded.decode('ascii')}", None
+    else:
+        url, data = endpoint, encoded
+    try:
+        req = urllib.request.Request(
+            url,
+            data=data,
+            headers=headers,
+        )
+        with HTTP_OPENER.open(req, timeout=REQUEST_TIMEOUT) as resp:
+            body = read_response(resp)
+            if out_format == "csv":
+                body = body.decode("utf-8")
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            print(f"  {tag} Not modified since last fetch")
+            done.set()
+            return NOT_MODIFIED, None
+        print(f"  {tag} HTTP {e.code}: {e.reason}", file=sys.stderr)
+        if e.code == 429:
+            print(f"  {tag} Rate limited, waiting 10s before next server...", file=sys.stderr)
+            time.sleep(10)
+        return None, e
+    except urllib.error.URLError as e:
+        print(f"  {tag} Network error: {e.reason}", file=sys.stderr)
+        time.sleep(60)
+        return None, e
+    except Exception as e:
+        print(f"  {tag} Unexpected error: {e}", file=sys.stderr)
+        time.sleep(60)  # since we're using the same API endpoint, rather than a fallback endpoint, we're going to wait 60 seconds on any network error to give the server time to be in a different state
+        return None, e
+
+    # Another server won while this request was in flight; discard the
+    # body rather than validating and parsing a second copy.
+    if done.is_set():
+        return None, None
+
+    if out_format == "csv":
+        data = body
+        element_count = len(data.split("\n"))
+        print(f"  {tag} Success: {element_count} elements")
+        update_validators(received, etag, last_modified, "")
+        done.set()
+        return data, None
+
+    # Check data freshness before paying for a full parse of a stale body
+    is_fresh, lag_hours, ts = check_data_freshness(peek_timestamp(body), max_lag_hours)
+    if not is_fresh:
+        print(
+            f"  {tag} Data is {lag_hours:.1f}h old (timestamp: {ts}), "
+            f"exceeds {max_lag_hours}h threshold. Trying next server...",
+            file=sys.stderr,
+        )
+        return None, Exception(f"Stale data from {endpoint}")
 
-    for endpoint in OVERPASS_ENDPOINTS:
-        print(f"Trying {endpoint} ...")
-        try:
-            req = urllib.request.Request(
-                endpoint,
-                data=encoded,
-                headers={"User-Agent": "microcosm-us-route-relations/1.0"},
-            )
-            with urllib.request.urlopen(req, timeout=REQUEST_TIMEOUT) as resp:
-                body = resp.read().decode("utf-8")
-        except urllib.error.HTTPError as e:
-            print(f"  HTTP {e.code}: {e.reason}", file=sys.stderr)
-            last_error = e
-            if e.code == 429:
-                print("  Rate limited, waiting 10s before next server...", file=sys.stderr)
-                time.sleep(10)
-            continue
-        except urllib.error.URLError as e:
-            print(f"  Network error: {e.reason}", file=sys.stderr)
-            last_error = e
-            time.sleep(60)
-            continue
-        except Exception as e:
-            print(f"  Unexpected error: {e}", file=sys.stderr)
-            last_error = e
-            time.sleep(60)  # since we're using the same API endpoint, rather than a fallback endpoint, we're going to wait 60 seconds on any network error to give the server time to be in a different state
-            continue
+    try:
+        data = json_loads(body)
+    except JSONDecodeError as e:
+        print(f"  {tag} Invalid JSON response: {e}", file=sys.stderr)
+        print(f"  {tag} (Does your query include [out:json]?)", file=sys.stderr)
+        return None, e
+    # Drop the raw payload now that the parsed tree holds the data
+    del body
+
+    # Check for Overpass remark (error/warning in a 200 response)
+    remark = data.get("remark")
+    if remark and not data.get("elements"):
+        print(f"  {tag} Overpass remark: {remark}", file=sys.stderr)
+        return None, Exception(remark)
+
+    if remark:
+        print(f"  {tag} Overpass remark (non-fatal): {remark}")
+
+    element_count = len(data.get("elements", []))
+    print(f"  {tag} Success: {element_count} elements, data timestamp: {ts}")
+    update_validators(received, etag, last_modified, ts)
+    done.set()
+    return data, None
+
+
+def update_validators(validators, etag, last_modified, timestamp_str):
+    """Record a successful response's validators in validators."""
+    if validators is None:
+        return
+    if etag:
+        validators["etag"] = etag
+    if last_modified:
+        validators["last_modified"] = last_modified
+    if timestamp_str and timestamp_str != "(unknown)":
+        validators["timestamp_osm_base"] = timestamp_str
 
-        # Parse JSON or CSV
-        if out_format == "json":
-            try:
-                data = json.loads(body)
-            except json.JSONDecodeError as e:
-                print(f"  Invalid JSON response: {e}", file=sys.stderr)
-                print("  (Does your query include [out:json]?)", file=sys.stderr)
-                last_error = e
-                continue
-        elif out_format == "csv":
-            data = body
-            element_count = len(data.split("\n"))
-            print(f"  Success: {element_count} elements")
-            return data
-
-        # Check for Overpass remark (error/warning in a 200 response)
-        remark = data.get("remark")
-        if remark and not data.get("elements"):
-            print(f"  Overpass remark: {remark}", file=sys.stderr)
-            last_error = Exception(remark)
-            continue
 
-        # Check data freshness for JSON data
-        is_fresh, lag_hours, ts = check_data_freshness(data, endpoint, max_lag_hours)
-        if not is_fresh:
-            print(
-                f"  Data is {lag_hours:.1f}h old (timestamp: {ts}), "
-                f"exceeds {max_lag_hours}h threshold. Trying next server...",
-                file=sys.stderr,
-            )
-            last_error = Exception(f"Stale data from {endpoint}")
-            continue
+def try_endpoint_attempts(endpoint, attempts, encoded, out_format, max_lag_hours,
+                          done, validators=None, delay=0):
+    """Run the configured attempts against one endpoint, one after another.
+
+    Each attempt starts only after the previous one has failed or timed
+    out, including its backoff, so a server never sees more than one
+    request at a time from us.
+
+    Returns (data, None, received) on success, where received holds the
+    winning response's validators, or (None, last_error, None) if all
+    attempts failed.
+    """
+    last_error = None
+    for attempt in attempts:
+        received = {}
+        data, error = try_endpoint(
+            attempt, endpoint, encoded, out_format, max_lag_hours, done,
+            validators=validators, received=received, delay=delay,
+        )
+        delay = 0
+        if data is not None:
+            return data, None, received
+        if error is not None:
+            last_error = error
+        if done.is_set():
+            break
+    return None, last_error, None
 
-        if remark:
-            print(f"  Overpass remark (non-fatal): {remark}")
 
-        if out_format == "json":
-            element_count = len(data.get("elements", []))
+def fetch_overpass(query, out_format="json", cache=None):
+    """Send query to Overpass API endpoints with fallback.
 
-        elif out_format == "csv":
-            element_count = len(data.split("\n")) 
+    Attempts against the same endpoint run one at a time, in order. With
+    a single distinct endpoint (the default configuration) the fetch is
+    fully sequential and nothing is left in flight when it returns.
+
+    When at least two distinct endpoints are configured, up to
+    MAX_CONCURRENT_REQUESTS of them are raced, with a short stagger, so a
+    slow or stale server does not hold up the whole fetch. The first
+    valid, fresh response wins and attempts not yet started are skipped.
+    A losing request that is already in flight cannot be aborted: it runs
+    until its response arrives or times out, may overlap a later query
+    to that server, and its body is then discarded unparsed.
+
+    If a fetch cache (see load_fetch_cache) is given, requests are made
+    conditional on the validators from the last successful fetch of this
+    query, and the cache is updated from the new response. Only pass a
+    cache when the previous output still exists to fall back on.
+
+    Returns parsed JSON response dict (or the raw text for CSV output),
+    or None if the server reports the data is unchanged.
+    """
+    max_lag_hours = float(
+        os.environ.get("TAP_IN_OSM_MAX_DATA_LAG_HOURS", DEFAULT_MAX_DATA_LAG_HOURS)
+    )
+    encoded = urllib.parse.urlencode({"data": query}).encode("utf-8")
+    last_error = None
+    done = threading.Event()
+    query_key = hashlib.sha256(query.encode("utf-8")).hexdigest()
+
+    # Group attempt numbers by endpoint, keeping first-seen endpoint order
+    attempts_by_endpoint = {}
+    for attempt, endpoint in enumerate(OVERPASS_ENDPOINTS):
+        attempts_by_endpoint.setdefault(endpoint, []).append(attempt)
+
+    def validators_for(endpoint):
+        # Worker threads only ever see a copy; the cache is written below,
+        # on this thread, from the winning attempt's own dict.
+        if cache is None:
+            return None
+        return dict(cache.get(endpoint, {}).get(query_key, {}))
+
+    if len(attempts_by_endpoint) < 2:
+        results = (
+            (endpoint, try_endpoint_attempts(
+                endpoint, attempts, encoded, out_format, max_lag_hours, done,
+                validators=validators_for(endpoint),
+            ))
+            for endpoint, attempts in attempts_by_endpoint.items()
+        )
+    else:
+        pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS)
+        futures = {
+            pool.submit(
+                try_endpoint_attempts,
+                endpoint, attempts, encoded, out_format, max_lag_hours, done,
+                validators=validators_for(endpoint),
+                delay=ENDPOINT_STAGGER_SECONDS * i if i < MAX_CONCURRENT_REQUESTS else 0,
+            ): endpoint
+            for i, (endpoint, attempts) in enumerate(attempts_by_endpoint.items())
+        }
+        results = ((futures[future], future.result()) for future in as_completed(futures))
 
-        print(f"  Success: {element_count} elements, data timestamp: {ts}")
-        return data
+    try:
+        for endpoint, (data, error, received) in results:
+            if data is NOT_MODIFIED:
+                return None
+            if data is not None:
+                if cache is not None:
+                    cache.setdefault(endpoint, {})[query_key] = received
+                return data
+            if error is not None:
+                last_error = error
+    finally:
+        if len(attempts_by_endpoint) >= 2:
+            # Another server's request may still be in flight; don't wait on it
+            pool.shutdown(wait=False, cancel_futures=True)
 
     print("Error: All Overpass endpoints failed.", file=sys.stderr)
     if last_error:
@@ -196,13 +447,12 @@ def fetch_overpass(query, out_format="json"):
 # ---------------------------------------------------------------------------
 
 def coords_from_geometry(geom_array):
-    """Convert Overpass geometry array [{lat,lon},...] to GeoJSON [[lon,lat],...]."""
-    coords = []
-    for pt in geom_array:
-        if pt is None:
-            continue
-        coords.append([pt["lon"], pt["lat"]])
-    return coords
+    """Convert Overpass geometry array [{lat,lon},...] to GeoJSON [(lon,lat),...].
+
+    Positions are tuples rather than lists: they are smaller in memory,
+    serialize to the same JSON arrays, and compare equal pairwise.
+    """
+    return [(pt["lon"], pt["lat"]) for pt in geom_array if pt is not None]
 
 
 def is_area(tags):
@@ -214,19 +464,19 @@ def is_area(tags):
         return False
 
     # Explicit area tag overrides everything
-    if tags.get("area") == "yes":
+    area = tags.get("area")
+    if area == "yes":
         return True
-    if tags.get("area") == "no":
+    if area == "no":
         return False
 
     # Check for area-indicating tag keys
-    for key in AREA_TAG_KEYS:
-        if key in tags:
-            return True
+    if not AREA_TAG_KEYS.isdisjoint(tags):
+        return True
 
     # Check specific tag=value pairs
-    for key, value in AREA_TAG_VALUES:
-        if tags.get(key) == value:
+    for key, values in AREA_TAG_VALUES_BY_KEY.items():
+        if tags.get(key) in values:
             return True
 
     return False
@@ -236,7 +486,7 @@ def is_closed(coords):
     """Check if a coordinate ring is closed (first == last)."""
     if len(coords) < 4:
         return False
-    return coords[0][0] == coords[-1][0] and coords[0][1] == coords[-1][1]
+    return coords[0] == coords[-1]
 
 
 def point_in_polygon(point, ring):
@@ -246,24 +496,46 @@ def point_in_polygon(point, ring):
     """
     x, y = point
     inside = False
-    n = len(ring)
-    j = n - 1
-    for i in range(n):
-        xi, yi = ring[i]
-        xj, yj = ring[j]
-        if ((yi > y) != (yj > y)) and (x < (xj - xi) * (y - yi) / (yj - yi) + xi):
+    xj, yj = ring[-1]
+    for xi, yi in ring:
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
             inside = not inside
-        j = i
+        xj, yj = xi, yi
     return inside
 
 
+def ring_bbox(ring):
+    """Compute the (min_lon, min_lat, max_lon, max_lat) bounds of a ring."""
+    lons, lats = zip(*ring)
+    return min(lons), min(lats), max(lons), max(lats)
+
+
 def ring_centroid(ring):
     """Compute a simple average centroid of a coordinate ring."""
     if not ring:
         return [0, 0]
-    lons = [c[0] for c in ring]
-    lats = [c[1] for c in ring]
-    return [sum(lons) / len(lons), sum(lats) / len(lats)]
+    lons, lats = zip(*ring)
+    return [sum(lons) / len(ring), sum(lats) / len(ring)]
+
+
+def endpoint_key(coord):
+    """Hashable key for a [lon, lat] endpoint, rounded to OSM precision."""
+    return (round(coord[0], COORD_PRECISION), round(coord[1], COORD_PRECISION))
+
+
+def take_endpoint(endpoints, used, key):
+    """Claim an unused way with an endpoint at key.
+
+    Returns (way_index, end) where end is 0 for the way's first point and
+    -1 for its last, or None if no unused way touches key.
+    """
+    entries = endpoints.get(key)
+    while entries:
+        idx, end = entries.pop()
+        if not used[idx]:
+            used[idx] = True
+            return idx, end
+    return None
 
 
 def merge_ways_into_rings(way_geometries):
@@ -280,48 +552,55 @@ def merge_ways_into_rings(way_geometries):
         return [], []
 
     # Work with copies so we don't mutate input
-    remaining = [list(wg) for wg in way_geometries if len(wg) >= 2]
+    ways = [list(wg) for wg in way_geometries if len(wg) >= 2]
+    used = [False] * len(ways)
     rings = []
     unclosed = []
 
-    while remaining:
-        # Start a new chain with the first remaining way
-        current = remaining.pop(0)
-
-        changed = True
-        while changed:
-            changed = False
-            for i, candidate in enumerate(remaining):
-                c_start = candidate[0]
-                c_end = candidate[-1]
-                cur_start = current[0]
-                cur_end = current[-1]
-
-                # Try to attach candidate to end of current
-                if cur_end[0] == c_start[0] and cur_end[1] == c_start[1]:
-                    current = current + candidate[1:]
-                    remaining.pop(i)
-                    changed = True
-                    break
-                elif cur_end[0] == c_end[0] and cur_end[1] == c_end[1]:
-                    current = current + list(reversed(candidate))[1:]
-                    remaining.pop(i)
-                    changed = True
-                    break
-                # Try to attach candidate to start of current
-                elif cur_start[0] == c_end[0] and cur_start[1] == c_end[1]:
+    # Index every way by both endpoints so each attachment is a dict lookup
+    # instead of a scan over all remaining ways.
+    endpoints = {}
+    for idx in range(len(ways) - 1, -1, -1):
+        way = ways[idx]
+        endpoints.setdefault(endpoint_key(way[-1]), []).append((idx, -1))
+        endpoints.setdefault(endpoint_key(way[0]), []).append((idx, 0))
+
+    for start_idx, current in enumerate(ways):
+        if used[start_idx]:
+            continue
+        # Start a new chain with the first unused way
+        used[start_idx] = True
+
+        while True:
+            # Try to attach a way to end of current
+            match = take_endpoint(endpoints, used, endpoint_key(current[-1]))
+            if match:
+                idx, end = match
+                candidate = ways[idx]
+                # Extend in place; current is our own copy of the chain
+                if end == 0:
+                    current.extend(candidate[1:])
+                else:
+                    current.extend(candidate[-2::-1])
+                continue
+
+            # Try to attach a way to start of current
+            match = take_endpoint(endpoints, used, endpoint_key(current[0]))
+            if match:
+                idx, end = match
+                candidate = ways[idx]
+                if end == -1:
                     current = candidate + current[1:]
-                    remaining.pop(i)
-                    changed = True
-                    break
-                elif cur_start[0] == c_start[0] and cur_start[1] == c_start[1]:
-                    current = list(reversed(candidate)) + current[1:]
-                    remaining.pop(i)
-                    changed = True
-                    break
-
-        # Check if ring closed
-        if is_closed(current):
+                else:
+                    current = candidate[::-1] + current[1:]
+                continue
+
+            break
+
+        # Check if ring closed, using the same rounding that joined the ways
+        if len(current) >= 4 and endpoint_key(current[0]) == endpoint_key(current[-1]):
+            # Close exactly, as GeoJSON requires first == last
+            current[-1] = current[0]
             rings.append(current)
         else:
             unclosed.append(current)
@@ -370,13 +649,17 @@ def build_multipolygon(members):
     # Assign inner rings to their containing outer ring
     # Each polygon = [outer_ring, inner1, inner2, ...]
     polygons = [[ring] for ring in outer_rings]
+    # Bounding boxes let most outer rings be ruled out without a full
+    # ray-casting pass over their vertices.
+    bboxes = [ring_bbox(ring) for ring in outer_rings] if inner_rings else []
 
     for inner in inner_rings:
-        centroid = ring_centroid(inner)
+        x, y = ring_centroid(inner)
         assigned = False
-        for polygon in polygons:
-            outer = polygon[0]
-            if point_in_polygon(centroid, outer):
+        for polygon, (min_x, min_y, max_x, max_y) in zip(polygons, bboxes):
+            if not (min_x <= x <= max_x and min_y <= y <= max_y):
+                continue
+            if point_in_polygon((x, y), polygon[0]):
                 polygon.append(inner)
                 assigned = True
                 break
@@ -393,104 +676,151 @@ def build_multipolygon(members):
 # Element to GeoJSON Feature conversion
 # ---------------------------------------------------------------------------
 
+def node_geometry(element, tags):
+    """Build the Point geometry for a node element, or None."""
+    if "lat" in element and "lon" in element:
+        return {
+            "type": "Point",
+            "coordinates": [element["lon"], element["lat"]],
+        }
+    return None
+
+
+def way_geometry(element, tags):
+    """Build the Polygon/LineString geometry for a way element, or None."""
+    geom_array = element.get("geometry")
+    if geom_array:
+        coords = coords_from_geometry(geom_array)
+        if len(coords) >= 2:
+            if is_closed(coords) and is_area(tags):
+                return {"type": "Polygon", "coordinates": [coords]}
+            return {"type": "LineString", "coordinates": coords}
+
+    # Fallback to center point if no geometry array
+    center = element.get("center")
+    if center:
+        return {
+            "type": "Point",
+            "coordinates": [center["lon"], center["lat"]],
+        }
+    return None
+
+
+def route_member_lines(members):
+    """Collect the coordinates of a route's way members as line strings.
+
+    Node members (stops, etc.) and ways with fewer than two points are skipped.
+    """
+    return [
+        coords
+        for member in members
+        if member.get("type") == "way" and member.get("geometry")
+        and len(coords := coords_from_geometry(member["geometry"])) >= 2
+    ]
+
+
+def relation_fallback_point(element):
+    """Point geometry from a relation's center or bounds, or None."""
+    center = element.get("center")
+    if center:
+        return {
+            "type": "Point",
+            "coordinates": [center["lon"], center["lat"]],
+        }
+    if element.get("bounds"):
+        b = element["bounds"]
+        return {
+            "type": "Point",
+            "coordinates": [
+                (b["minlon"] + b["maxlon"]) / 2,
+                (b["minlat"] + b["maxlat"]) / 2,
+            ],
+        }
+    return None
+
+
+def relation_geometry(element, tags):
+    """Build the geometry for a relation element from its members, or None."""
+    members = element.get("members")
+    if not members:
+        return relation_fallback_point(element)
+
+    geometry = None
+    rel_type = tags.get("type", "")
+
+    if rel_type in POLYGON_RELATION_TYPES:
+        geometry = build_multipolygon(members)
+
+    elif rel_type == "route":
+        lines = route_member_lines(members)
+        if len(lines) == 1:
+            geometry = {"type": "LineString", "coordinates": lines[0]}
+        elif lines:
+            geometry = {"type": "MultiLineString", "coordinates": lines}
+
+    # Fallback for relations without member geometry
+    if geometry is None:
+        geometry = relation_fallback_point(element)
+
+    return geometry
+
+
+# Geometry builder for each OSM element type
+GEOMETRY_HANDLERS = {
+    "node": node_geometry,
+    "way": way_geometry,
+    "relation": relation_geometry,
+}
+
+
 def element_to_feature(element):
     """Convert a single Overpass JSON element to a GeoJSON Feature.
 
     Returns a Feature dict, or None if the element has no usable geometry.
     """
     elem_type = element.get("type", "")
-    elem_id = element.get("id", 0)
-    tags = element.get("tags", {})
-
-    properties = dict(tags)
-    properties["@id"] = f"{elem_type}/{elem_id}"
-    properties["@type"] = elem_type
-
-    geometry = None
-
-    if elem_type == "node":
-        if "lat" in element and "lon" in element:
-            geometry = {
-                "type": "Point",
-                "coordinates": [element["lon"], element["lat"]],
-            }
-
-    elif elem_type == "way":
-        geom_array = element.get("geometry")
-        if geom_array:
-            coords = coords_from_geometry(geom_array)
-            if len(coords) >= 2:
-                if is_closed(coords) and is_area(tags):
-                    geometry = {"type": "Polygon", "coordinates": [coords]}
-                else:
-                    geometry = {"type": "LineString", "coordinates": coords}
-
-        # Fallback to center point if no geometry array
-        if geometry is None:
-            center = element.get("center")
-            if center:
-                geometry = {
-                    "type": "Point",
-                    "coordinates": [center["lon"], center["lat"]],
-                }
-
-    elif elem_type == "relation":
-        rel_type = tags.get("type", "")
-        members = element.get("members", [])
-
-        if rel_type in ("multipolygon", "boundary") and members:
-            geometry = build_multipolygon(members)
-
-        elif rel_type == "route" and members:
-            lines = []
-            for member in members:
-                if member.get("type") == "way" and member.get("geometry"):
-                    coords = coords_from_geometry(member["geometry"])
-                    if len(coords) >= 2:
-                        lines.append(coords)
-                elif member.get("type") == "node":
-                    # Skip node members of routes (stops, etc.)
-                    pass
-            if lines:
-                if len(lines) == 1:
-                    geometry = {"type": "LineString", "coordinates": lines[0]}
-                else:
-                    geometry = {"type": "MultiLineString", "coordinates": lines}
-
-        # Fallback for relations without member geometry
-        if geometry is None:
-            center = element.get("center")
-            if center:
-                geometry = {
-                    "type": "Point",
-                    "coordinates": [center["lon"], center["lat"]],
-                }
-            elif element.get("bounds"):
-                b = element["bounds"]
-                geometry = {
-                    "type": "Point",
-                    "coordinates": [
-                        (b["minlon"] + b["maxlon"]) / 2,
-                        (b["minlat"] + b["maxlat"]) / 2,
-                    ],
-                }
+    handler = GEOMETRY_HANDLERS.get(elem_type)
+    if handler is None:
+        return None
 
+    tags = element.get("tags", {})
+    geometry = handler(element, tags)
     if geometry is None:
         return None
 
+    # The OSM reference lives in the Feature's top-level id, so the tags
+    # can be used as properties without copying them
+    elem_id = element.get("id", 0)
+
     return {
         "type": "Feature",
+        "id": f"{elem_type}/{elem_id}",
         "geometry": geometry,
-        "properties": properties,
+        "properties": tags,
+        # Consumed by write_geojson; saves re-parsing "id" when sorting
+        "_sort_key": (TYPE_ORDER.get(elem_type, 9), elem_id),
     }
 
 
 def elements_to_features(elements):
-    """Convert all Overpass elements to GeoJSON Features."""
+    """Convert all Overpass elements to GeoJSON Features.
+
+    Large element lists are converted across a process pool, since each
+    element is independent and the geometry work is CPU-bound.
+    """
+    if len(elements) < PARALLEL_MIN_ELEMENTS:
+        return collect_features(map(element_to_feature, elements))
+
+    with ProcessPoolExecutor() as pool:
+        results = pool.map(element_to_feature, elements, chunksize=PARALLEL_CHUNKSIZE)
+        return collect_features(results)
+
+
+def collect_features(results):
+    """Gather converted features, reporting elements without geometry."""
     features = []
     skipped = 0
-    for element in elements:
-        feature = element_to_feature(element)
+    for feature in results:
         if feature:
             features.append(feature)
         else:
@@ -509,6 +839,25 @@ def elements_to_features(elements):
 # Safety checks
 # ---------------------------------------------------------------------------
 
+def count_features(path):
+    """Count the features in an existing output file without parsing it.
+
+    GeoJSONSeq files (.geojsonl) hold one feature per line. For a
+    FeatureCollection, the file is memory-mapped and the starts of Feature
+    objects are counted, so no Python objects are built for the features.
+    The count relies on the key order this script writes; it is approximate
+    for files from other writers, or for a properties object that itself
+    begins with "type": "Feature" followed by an "id" or "geometry" tag.
+    """
+    with open(path, "rb") as f:
+        if path.endswith(".geojsonl"):
+            return sum(1 for line in f if line.strip())
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("file is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return sum(1 for _ in FEATURE_TYPE_RE.finditer(mm))
+
+
 def check_feature_drop(new_count, output_path, threshold):
     """Compare new feature count against existing file.
 
@@ -519,10 +868,8 @@ def check_feature_drop(new_count, output_path, threshold):
         return
 
     try:
-        with open(output_path, "r", encoding="utf-8") as f:
-            existing = json.load(f)
-        old_count = len(existing.get("features", []))
-    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        old_count = count_features(output_path)
+    except (OSError, ValueError) as e:
         print(f"  Warning: Could not parse existing {output_path}: {e}", file=sys.stderr)
         print("  Skipping reduction check.", file=sys.stderr)
         return
@@ -552,27 +899,73 @@ def check_feature_drop(new_count, output_path, threshold):
 
 def sort_key(feature):
     """Sort key for canonical feature ordering: node < way < relation, then by ID."""
-    type_order = {"node": 0, "way": 1, "relation": 2}
-    props = feature.get("properties", {})
-    osm_type = props.get("@type", "")
-    # Extract numeric ID from "@id" like "node/12345"
-    osm_id_str = props.get("@id", "")
+    # Split the id like "node/12345" into type and numeric ID
+    osm_type, _, osm_id_str = str(feature.get("id", "")).partition("/")
     try:
-        osm_id = int(osm_id_str.split("/", 1)[1])
-    except (IndexError, ValueError):
+        osm_id = int(osm_id_str)
+    except ValueError:
         osm_id = 0
-    return (type_order.get(osm_type, 9), osm_id)
+    return (TYPE_ORDER.get(osm_type, 9), osm_id)
+
+
+def pop_sort_key(feature):
+    """Sort key that consumes the "_sort_key" cached by element_to_feature.
+
+    Falls back to sort_key for features built elsewhere.
+    """
+    key = feature.pop("_sort_key", None)
+    if key is None:
+        return sort_key(feature)
+    return key
 
 
 def write_geojson(features, path):
     """Write a GeoJSON FeatureCollection to file, sorted by OSM ID."""
-    features = sorted(features, key=sort_key)
+    features = sorted(features, key=pop_sort_key)
     geojson = {
         "type": "FeatureCollection",
         "features": features,
     }
+    with open(path, "wb") as f:
+        json_dump(geojson, f)
+        f.write(b"\n")
+
+
+def write_geojson_seq(features, path):
+    """Write features as newline-delimited GeoJSON (GeoJSONSeq), sorted by OSM ID.
+
+    Each line is one complete Feature, so consumers can stream the file
+    without parsing a whole FeatureCollection — the same layout as
+    CityJSONFeature streams. The file extension is replaced with .geojsonl.
+
+    Returns the path written.
+    """
+    seq_path = os.path.splitext(path)[0] + ".geojsonl"
+    with open(seq_path, "wb") as f:
+        for feature in sorted(features, key=pop_sort_key):
+            f.write(json_dumps_line(feature))
+            f.write(b"\n")
+    return seq_path
+
+
+def load_fetch_cache(path=FETCH_CACHE_FILE):
+    """Load the HTTP validator cache written by save_fetch_cache.
+
+    Maps endpoint -> query hash -> {etag, last_modified, timestamp_osm_base}.
+    Returns an empty cache if the file is missing or unreadable.
+    """
+    try:
+        with open(path, "rb") as f:
+            cache = json_loads(f.read())
+    except (OSError, JSONDecodeError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_fetch_cache(cache, path=FETCH_CACHE_FILE):
+    """Write the HTTP validator cache for the next run."""
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(geojson, f, ensure_ascii=False, indent=2)
+        json.dump(cache, f, indent=2, sort_keys=True)
         f.write("\n")
 
 
@@ -582,12 +975,18 @@ def read_config(config_file=CONFIG_FILE):
     return config
 
 
-def run_single_export_for_config(cfg, id, name):
+def run_single_export_for_config(cfg, id, name, cache=None):
     output_path = f"{cfg['output_folder']}/{cfg['filename_prefix']}{name}.{cfg['extension']}"
     query = f"{cfg['query_pre']}{id}{cfg['query_post']}"
     print(f"Query is '{query}'")
+    # Conditional requests are only safe if there is existing output to keep
+    if not os.path.exists(output_path):
+        cache = None
     try:
-        data = fetch_overpass(query, "csv")
+        data = fetch_overpass(query, "csv", cache=cache)
+        if data is None:
+            print(f"Data for {name} is unchanged, keeping existing {output_path}")
+            return None
         print(f"Writing output for {name}")
         with open(output_path, 'w') as output:
             output.write(data)
@@ -601,13 +1000,15 @@ def run_single_export_for_config(cfg, id, name):
 
 def main():
     config = read_config(CONFIG_FILE)
+    cache = load_fetch_cache(FETCH_CACHE_FILE)
 
     run_dir = os.path.dirname(os.path.abspath(__file__))
     os.makedirs(os.path.join(run_dir, "tsv"), exist_ok=True)
 
     for cfg in config: # there could be more than one
         for item in cfg['ids']:
-            data = run_single_export_for_config(cfg, item['id'], item['name'])
+            data = run_single_export_for_config(cfg, item['id'], item['name'], cache)
+            save_fetch_cache(cache, FETCH_CACHE_FILE)
             time.sleep(10)
 
 if __name__ == "__main__":